@@ -1,6 +1,10 @@
 from ophyd import Device, Component as Cpt, EpicsSignal, EpicsSignalRO
+from ophyd.utils import FailedStatus
+import asyncio
 import socket
 
+import bluesky.plan_stubs as bps
+
 
 class BeamlineCalibrations(Device):
     LoMagCal = Cpt(EpicsSignal, 'LoMagCal}')
@@ -20,13 +24,9 @@ puck_safety = PuckSafety('XF:17IDC-OP:FMX{DewarSwitch}Seq', name='puck_safety',
                         read_attrs=[],
                         labels=['fmx'])
 
-def blStrGet():
+def _blStrCompute():
     """
-    Return beamline string
-    
-    blStr: 'AMX' or 'FMX'
-    
-    Beamline is determined by querying hostname
+    Return beamline string determined from the hostname, -1 if unknown
     """
     hostStr = socket.gethostname()
     if hostStr.startswith('xf17id2'):
@@ -34,17 +34,39 @@ def blStrGet():
     elif hostStr.startswith('xf17id1'):
         blStr = 'AMX'
     else: 
-        print('Error - this code must be executed on one of the -ca1 machines')
         blStr = -1
         
     return blStr
 
+# The hostname does not change during a session, look it up only once
+_BL_STR = _blStrCompute()
+
+
+def blStrGet():
+    """
+    Return beamline string
+    
+    blStr: 'AMX' or 'FMX'
+    
+    Beamline is determined by querying hostname
+    """
+    if _BL_STR == -1:
+        print('Error - this code must be executed on one of the -ca1 machines')
+        
+    return _BL_STR
+
 
-def get_energy():
+def get_energy(snapshot=None):
     """
     Returns the current photon energy in eV derived from the DCM Bragg angle
+    
+    snapshot: Optional dict from _snapshot_state(), read the energy from it
+              instead of doing a separate CA get
     """ 
     
+    if snapshot is not None:
+        return snapshot['energy']
+    
     blStr = blStrGet()
     if blStr == -1: return -1
     
@@ -56,3 +78,45 @@ def get_energy():
     return energy
 
 
+def wait_for_status(status):
+    """
+    Plan stub that waits for an ophyd status object to finish
+    
+    The status is handed to the RunEngine as an asyncio future, so the
+    RunEngine event loop keeps running while waiting. Use this instead of
+    polling a signal with time.sleep() inside a plan.
+    
+    status: ophyd status object, e.g. a SubscriptionStatus
+    
+    Raises the status exception if the status finishes unsuccessfully,
+    e.g. on a timeout.
+    
+    Examples
+    --------
+    status = SubscriptionStatus(cover_detector.status, is_closed)
+    yield from wait_for_status(status)
+    """
+    futures = []
+    
+    def status_future():
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        futures.append(future)
+        
+        def set_done(st):
+            if future.done():
+                return
+            if st.success:
+                future.set_result(None)
+            else:
+                future.set_exception(st.exception() or FailedStatus(st))
+        
+        status.add_callback(lambda st: loop.call_soon_threadsafe(set_done, st))
+        return future
+    
+    yield from bps.wait_for([status_future])
+    
+    # The RunEngine does not re-raise exceptions of awaited futures,
+    # so retrieve the result here to fail the plan
+    for future in futures:
+        future.result()
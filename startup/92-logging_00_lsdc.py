@@ -4,6 +4,8 @@ import pandas as pd
 import datetime
 import epics
 import time
+import bluesky.plan_stubs as bps
+from ophyd.status import SubscriptionStatus
 
 # Global variable flux_df
 """
@@ -43,24 +45,33 @@ def trans_set(transmission, trans = trans_bcu):
         print('Monochromator energy out of range. Must be within 5000 - 30000 eV. Exiting.')
         return
     
-    yield from bps.mv(trans.energy, e_dcm) # This energy PV is only used for debugging
-    yield from bps.mv(trans.transmission, transmission)
+    yield from bps.mv(trans.energy, e_dcm, # This energy PV is only used for debugging
+                      trans.transmission, transmission)
     yield from bps.mv(trans.set_trans, 1)
     
+    def is_done(*, value, **kwargs):
+        return value == 1
+    
     if trans == trans_bcu:
-        while atten_bcu.done.get() != 1:
-            time.sleep(0.5)
+        status = SubscriptionStatus(atten_bcu.done, is_done)
+        yield from wait_for_status(status)
     
     print('Attenuator = ' + trans.name + ', Transmission set to %.3f' % trans.transmission.get())
     return
 
 
-def trans_get(trans = trans_bcu):
+def trans_get(trans = trans_bcu, snapshot=None):
     """
     Returns the Attenuator transmission
+    
+    snapshot: Optional dict from _snapshot_state(), read the transmission from it
+              instead of doing a separate CA get
     """
     
-    transmission = trans.transmission.get()
+    if snapshot is not None:
+        transmission = snapshot[trans.name]
+    else:
+        transmission = trans.transmission.get()
     
     print('Attenuator = ' + trans.name + ', Transmission = %.3f' % transmission)
     return transmission
@@ -76,6 +87,52 @@ def get_fluxKeithley():
     return keithFlux
 
 
+def _snapshot_state(keys):
+    """
+    Reads energy and attenuator transmissions in one CA round trip
+    
+    keys: Values to read, any of 'energy', 'trans_bcu' and 'trans_ri'
+    
+    Returns a dict with the requested keys. Pass it as snapshot to get_energy()
+    and trans_get() to log several values of the same plan step without one
+    CA get per value. Only the requested PVs are read.
+    
+    Examples
+    --------
+    state = _snapshot_state(['energy', 'trans_bcu'])
+    transOrgBCU = trans_get(trans=trans_bcu, snapshot=state)
+    energy = get_energy(snapshot=state)
+    """
+    
+    transmissions = {trans_bcu.name: trans_bcu, trans_ri.name: trans_ri}
+    
+    snapshot = {}
+    pvnames = {}
+    for key in keys:
+        if key == 'energy':
+            blStr = blStrGet()
+            if blStr == -1:
+                snapshot['energy'] = -1
+            elif blStr == 'AMX':
+                pvnames['energy'] = vdcm.e.user_readback.pvname
+            else:
+                pvnames['energy'] = hdcm.e.user_readback.pvname
+        elif key in transmissions:
+            pvnames[key] = transmissions[key].transmission.pvname
+        else:
+            raise ValueError('keys must be from {}'.format(['energy'] + list(transmissions)))
+    
+    if pvnames:
+        # Same timeout as the ophyd signal defaults set in 00-startup.py
+        values = epics.caget_many(list(pvnames.values()), timeout=10)
+        for (key, pvname), value in zip(pvnames.items(), values):
+            if value is None:
+                raise TimeoutError('Failed to read PV {}'.format(pvname))
+            snapshot[key] = value
+    
+    return snapshot
+
+
 def set_fluxBeam(flux):
     """
     Sets the flux reference field.
@@ -157,11 +214,18 @@ def fmx_flux_reference(slit1GapList = [2000, 1000, 600, 400], slit1GapDefault =
     """
     
     # Store current transmission, then set full transmission
+    state = None
     if transSet != 'None':
+        stateKeys = ['energy']
         if transSet in ['All', 'BCU']:
-            transOrgBCU = trans_get(trans=trans_bcu)
+            stateKeys.append('trans_bcu')
         if transSet in ['All', 'RI']:
-            transOrgRI = trans_get(trans=trans_ri)
+            stateKeys.append('trans_ri')
+        state = _snapshot_state(stateKeys)
+        if transSet in ['All', 'BCU']:
+            transOrgBCU = trans_get(trans=trans_bcu, snapshot=state)
+        if transSet in ['All', 'RI']:
+            transOrgRI = trans_get(trans=trans_ri, snapshot=state)
             yield from trans_set(1.0, trans=trans_ri)
         if transSet == 'BCU':
             yield from trans_set(1.0, trans=trans_bcu)
@@ -169,7 +233,7 @@ def fmx_flux_reference(slit1GapList = [2000, 1000, 600, 400], slit1GapDefault =
             yield from trans_set(1.0, trans=trans_bcu)
             
     print(datetime.datetime.now())
-    msgStr = "Energy = " + "%.1f" % get_energy() + " eV"
+    msgStr = "Energy = " + "%.1f" % get_energy(snapshot=state) + " eV"
     print(msgStr)
     log_fmx(msgStr)
     
@@ -43,15 +43,40 @@ LGP_valid = (kbm.hp, kbm.hx, kbm.vp, kbm.vy)
 LUT_valid_names = [m.name for m in LUT_valid] + ['ivu_gap_off']
 LGP_valid_names = [m.name for m in LGP_valid]
 
+# LookUp tables already read by read_lut(), keyed by name, together with the
+# timestamps of the X/Y waveforms they were built from. The waveform PVs are
+# monitored, so a changed timestamp shows the cached table is out of date.
+_lut_cache = {}
+
+def _lut_pvs(name):
+    """
+    Returns the monitored X and Y LookUp table waveform PVs of a motor
+    """
+    return [epics.get_pv(LUT_fmt.format(name, axis), auto_monitor=True) for axis in 'XY']
+
+
 def read_lut(name):
     """
     Reads the LookUp table values for a specific motor
+    
+    The table is cached until one of its waveform PVs changes
     """
     if name not in LUT_valid_names:
         raise ValueError('name must be one of {}'.format(LUT_valid_names))
 
-    x, y = [epics.caget(LUT_fmt.format(name, axis)) for axis in 'XY']
-    return pd.DataFrame({'Energy':x, 'Position': y})
+    pvs = _lut_pvs(name)
+    for pv in pvs:
+        pv.wait_for_connection()
+
+    # Take the timestamps before the values: if a waveform changes in between,
+    # the stored timestamps are older than the table and the next call rebuilds it
+    timestamps = tuple(pv.timestamp for pv in pvs)
+    cached = _lut_cache.get(name)
+    if cached is None or cached[0] != timestamps:
+        x, y = [pv.get() for pv in pvs]
+        cached = (timestamps, pd.DataFrame({'Energy':x, 'Position': y}))
+        _lut_cache[name] = cached
+    return cached[1].copy()
 
 
 def write_lut(name, energy, position):
@@ -66,6 +91,7 @@ def write_lut(name, energy, position):
 
     epics.caput(LUT_fmt.format(name, 'X'), energy)
     epics.caput(LUT_fmt.format(name, 'Y'), position)
+    _lut_cache.pop(name, None)
 
 
 def read_lgp(name):
@@ -112,7 +138,7 @@ def setE_motors_FMX(energy):
 
     # Remove CRLs if going to energy < 9 keV (FMX specific)
     if energy < 9001:
-        set_beamsize('V0','H0')
+        yield from set_beamsize('V0','H0')
     
     # Lookup Table
     def lut(motor):
@@ -429,6 +455,6 @@ def setE(energy,
     
     # Restore initial Slit 1 gap positions
     if slit1Set:
-        yield from bps.mv(slits1.x_gap, slits1XGapOrg)  # Move Slit 1 X to original position
-        yield from bps.mv(slits1.y_gap, slits1YGapOrg)  # Move Slit 1 Y to original position
+        yield from bps.mv(slits1.x_gap, slits1XGapOrg,  # Move Slit 1 X to original position
+                          slits1.y_gap, slits1YGapOrg)  # Move Slit 1 Y to original position
     
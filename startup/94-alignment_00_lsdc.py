@@ -5,6 +5,7 @@ import bluesky.preprocessors as bpp
 import bluesky.plans as bp
 import bluesky.plan_stubs as bps
 import numpy as np
+from ophyd.status import SubscriptionStatus
 
 
 def centroid_avg(stats):
@@ -38,11 +39,12 @@ def detectorCoverClose():
     """
     Closes the Detector Cover
     """
-    yield from bps.mv(cover_detector.close, 1)
+    def is_closed(*, value, **kwargs):
+        return value != 1
     
-    while cover_detector.status.get() == 1:
-        #print(cover_detector.status.get())
-        time.sleep(0.5)
+    yield from bps.mv(cover_detector.close, 1)
+    status = SubscriptionStatus(cover_detector.status, is_closed)
+    yield from wait_for_status(status)
     
     return
 
@@ -50,11 +52,12 @@ def detectorCoverOpen():
     """
     Opens the Detector Cover
     """
-    yield from bps.mv(cover_detector.open, 1)
+    def is_open(*, value, **kwargs):
+        return value == 1
     
-    while cover_detector.status.get() != 1:
-        #print(cover_detector.status.get())
-        time.sleep(0.5)
+    yield from bps.mv(cover_detector.open, 1)
+    status = SubscriptionStatus(cover_detector.status, is_open)
+    yield from wait_for_status(status)
     
     return
 
@@ -63,9 +66,14 @@ def transDefaultGet(energy):
     """
     Returns the default transmission to avoid saturation of the scintillator
     
-    energy: X-ray energy [eV]
+    energy: X-ray energy [eV], scalar or array
     
     The look up table is set in settings/set_energy setup FMX.ipynb
+    
+    Examples
+    --------
+    transDefaultGet(12660)
+    transDefaultGet(np.linspace(6000, 16000, 51))
     """
     
     # This reads from:
@@ -76,7 +84,7 @@ def transDefaultGet(energy):
     # To be replaced by trans_bcu and corresponding new PVs
     
     transLUT = read_lut('atten')
-    transDefault = np.interp(energy,transLUT['Energy'],transLUT['Position'])
+    transDefault = np.interp(energy, transLUT['Energy'].values, transLUT['Position'].values)
     
     return transDefault
     
@@ -138,7 +146,7 @@ def beam_center_align(transSet='All'):
         return -1
         
     print('Closing detector cover')
-    detectorCoverClose()
+    yield from detectorCoverClose()
     
     # Transition to Governor state AB (Auto-align Beam)
     govStateSet('AB')
@@ -146,24 +154,33 @@ def beam_center_align(transSet='All'):
     # Set beam transmission that avoids scintillator saturation
     # Default values are defined in settings as lookup table
     if transSet != 'None':
-        transDefault = transDefaultGet( get_energy() )
+        stateKeys = ['energy']
+        if blStr == 'FMX':
+            if transSet in ['All', 'BCU']:
+                stateKeys.append('trans_bcu')
+            if transSet in ['All', 'RI']:
+                stateKeys.append('trans_ri')
+        else:
+            stateKeys.append('trans_bcu')
+        state = _snapshot_state(stateKeys)
+        transDefault = transDefaultGet( get_energy(snapshot=state) )
         if blStr == 'FMX':
             if transSet in ['All', 'BCU']:
-                transOrgBCU = trans_get(trans=trans_bcu)
+                transOrgBCU = trans_get(trans=trans_bcu, snapshot=state)
             if transSet in ['All', 'RI']:
-                transOrgRI = trans_get(trans=trans_ri)
+                transOrgRI = trans_get(trans=trans_ri, snapshot=state)
                 yield from trans_set(transDefault, trans=trans_ri)
             if transSet == 'BCU':
                 yield from trans_set(transDefault, trans=trans_bcu)
             if transSet == 'All':
                 yield from trans_set(1, trans=trans_bcu)
         else:
-            transOrgBCU = trans_get(trans=trans_bcu)
+            transOrgBCU = trans_get(trans=trans_bcu, snapshot=state)
             yield from trans_set(transDefault, trans=trans_bcu)
     
     # Retract all CRLs, i.e. set beamsize to "not expanded"
     # ToDo: write a "get_beamsize" to save current setting and restore later
-    set_beamsize('V0','H0')
+    yield from set_beamsize('V0','H0')
             
     # Retract backlight
     yield from bps.mv(light.y,govPositionGet('li', 'Out'))
@@ -18,30 +18,36 @@ def set_beamsize(sizeV, sizeH):
     if get_energy()<9000.0:
         print('Warning: For energies < 9 keV, use KB mirrors to defocus, not CRLs')
     
+    # Collect the lens moves of both axes and set them all at once
+    crlMoves = []
+    
     if sizeV == 'V0':
-        yield from bps.mv(transfocator.vs.mv_out, 1)
-        yield from bps.mv(transfocator.v2a.mv_out, 1)
-        yield from bps.mv(transfocator.v1a.mv_out, 1)
-        yield from bps.mv(transfocator.v1b.mv_out, 1)
+        crlMoves += [transfocator.vs.mv_out, 1,
+                     transfocator.v2a.mv_out, 1,
+                     transfocator.v1a.mv_out, 1,
+                     transfocator.v1b.mv_out, 1]
     elif sizeV == 'V1':
-        yield from bps.mv(transfocator.vs.mv_in, 1)
-        yield from bps.mv(transfocator.v2a.mv_out, 1)
-        yield from bps.mv(transfocator.v1a.mv_out, 1)
-        yield from bps.mv(transfocator.v1b.mv_in, 1)
+        crlMoves += [transfocator.vs.mv_in, 1,
+                     transfocator.v2a.mv_out, 1,
+                     transfocator.v1a.mv_out, 1,
+                     transfocator.v1b.mv_in, 1]
     else:
         print("Error: Vertical size argument has to be \'V0\' or  \'V1\'")
     
     if sizeH == 'H0':
-        yield from bps.mv(transfocator.h4a.mv_out, 1)
-        yield from bps.mv(transfocator.h2a.mv_out, 1)
-        yield from bps.mv(transfocator.h1a.mv_out, 1)
-        yield from bps.mv(transfocator.h1b.mv_out, 1)
+        crlMoves += [transfocator.h4a.mv_out, 1,
+                     transfocator.h2a.mv_out, 1,
+                     transfocator.h1a.mv_out, 1,
+                     transfocator.h1b.mv_out, 1]
     elif sizeH == 'H1':
-        yield from bps.mv(transfocator.h4a.mv_out, 1)
-        yield from bps.mv(transfocator.h2a.mv_in, 1)
-        yield from bps.mv(transfocator.h1a.mv_in, 1)
-        yield from bps.mv(transfocator.h1b.mv_in, 1)
+        crlMoves += [transfocator.h4a.mv_out, 1,
+                     transfocator.h2a.mv_in, 1,
+                     transfocator.h1a.mv_in, 1,
+                     transfocator.h1b.mv_in, 1]
     else:
         print("Error: Horizontal size argument has to be \'H0\' or  \'H1\'")
     
+    if crlMoves:
+        yield from bps.mv(*crlMoves)
+    
     return
@@ -1,8 +1,11 @@
 import epics
+import functools
+import math
+import numbers
 import numpy as np
 import matplotlib.pyplot as plt
 import time
-from lmfit import Model
+from ophyd.status import SubscriptionStatus
 
 #import bluesky.preprocessors as bpp
 #import bluesky.plans as bp
@@ -10,10 +13,7 @@ from lmfit import Model
 #import pandas as pd
 
 
-def help_fmx():
-    """List FMX beamline functions with a short explanation"""
-    
-    print("""
+_HELP_TEXT = """
     FMX beamline functions:
     
     anneal()        - Transitions Governor from SA to CB state and inserts annealer
@@ -44,10 +44,18 @@ def help_fmx():
     xrf_spectrum_plot() - Plot a XIA Mercury XRF spectrum
 
     Use help() to get more info, e.g. help(setE)
-    """)
+    """
+
+
+def help_fmx():
+    """List FMX beamline functions with a short explanation"""
+    
+    print(_HELP_TEXT)
     
     return
 
+help_fmx.__doc__ = (help_fmx.__doc__ or '') + '\n' + _HELP_TEXT
+
 
 def anneal(t=1.0):
     """
@@ -71,25 +79,69 @@ def anneal(t=1.0):
         print('Not in Governor state SA, exiting')
         return -1
     
+    def is_set(*, value, **kwargs):
+        return bool(value)
+    
     govStateSet('CB')
     
     annealer.air.put(1)
-    
-    while not annealer.inStatus.get():
-        #print(annealer.inStatus.get())
-        time.sleep(0.1)
+    SubscriptionStatus(annealer.inStatus, is_set).wait()
     
     time.sleep(t)
     annealer.air.put(0)
-    
-    while not annealer.outStatus.get():
-        #print(annealer.outStatus.get())
-        time.sleep(0.1)
+    SubscriptionStatus(annealer.outStatus, is_set).wait()
     
     govStateSet('SA')
     
     return
 
+
+_influence_prefixes = {'hfm': 'XF:17IDA-OP:FMX{Mir:HFM-PS}:',
+                       'kb': 'XF:17IDC-OP:FMX{Mir:KB-PS}:'}
+
+# Demand (current voltage) readback PV names of each 16 electrode bank
+_DEMAND_PV_NAMES = {
+    (bimorph, bank): tuple(prefix + 'U{}_CURRENT_MON'.format(i)
+                           for i in range((bank-1)*16, bank*16))
+    for bimorph, prefix in _influence_prefixes.items()
+    for bank in (1, 2)
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _get_influence_pvs(bimorph, bank):
+    """
+    Returns the bimorph power supply PVs used by set_influence()
+    
+    (bank_pv, incr_pv, decr_pv, step_pv, demand_pvs)
+    
+    The PVs are created on the first call for a (bimorph, bank) pair, later
+    calls reuse the same, already connected channels.
+    """
+    prefix = _influence_prefixes[bimorph]
+    return (epics.get_pv(prefix + 'BANK_NO_32'),
+            epics.get_pv(prefix + 'INCR_U_CMD.A'),
+            epics.get_pv(prefix + 'DECR_U_CMD.A'),
+            epics.get_pv(prefix + 'U_STEP_MON.A'),
+            tuple(epics.get_pv(name) for name in _DEMAND_PV_NAMES[(bimorph, bank)]))
+
+
+def _caget_pipelined(pvs):
+    """
+    Read a list of PVs with all CA get requests in flight at once
+    
+    Issues one asynchronous get per channel, flushes them with a single
+    ca.poll() and then collects the replies, so the total latency is about
+    one network round trip instead of one round trip per PV.
+    """
+    for pv in pvs:
+        pv.wait_for_connection()
+    for pv in pvs:
+        epics.ca.get(pv.chid, wait=False)
+    epics.ca.poll()
+    return [epics.ca.get_complete(pv.chid) for pv in pvs]
+
+
 def set_influence(electrode, bimorph, bank):
     """
     Step up/down bimorph mirror electrodes for influence function measurements.
@@ -130,21 +182,15 @@ def set_influence(electrode, bimorph, bank):
         print("electrode must be between 0 and 31")
         return
     
-    if bimorph == 'hfm':
-        prefix = 'XF:17IDA-OP:FMX{Mir:HFM-PS}:'
-    elif bimorph == 'kb':
-        prefix = 'XF:17IDC-OP:FMX{Mir:KB-PS}:'
-        
-    bank_pv = epics.PV(prefix+'BANK_NO_32')
-    incr_pv = epics.PV(prefix+'INCR_U_CMD.A')
-    decr_pv = epics.PV(prefix+'DECR_U_CMD.A')        
-    step_pv = epics.PV(prefix + 'U_STEP_MON.A')
-    demand_pvs = [epics.PV(prefix + 'U{}_CURRENT_MON'.format(i)) for i in range((bank-1)*16, bank*16)]
+    if bank not in (1, 2):
+        print("bank must be 1 or 2")
+        return
+    
+    bank_pv, incr_pv, decr_pv, step_pv, demand_pvs = _get_influence_pvs(bimorph, bank)
     
     bank_pv.put(bank-1, wait=True)
     time.sleep(0.5)
-    step = step_pv.get()
-    demands = [pv.get() for pv in demand_pvs]
+    step, *demands = _caget_pipelined((step_pv, *demand_pvs))
     new_demands = demands[:]
     
     i = electrode if electrode < 16 else electrode-16
@@ -152,10 +198,9 @@ def set_influence(electrode, bimorph, bank):
         new_demands[i - 1] -= step
     new_demands[i] += step
     
-    for diff in np.diff(np.array(new_demands)):
-        if abs(diff) > 500:
-            print("got difference between values larger than 500")
-            return
+    if any(abs(a - b) > 500 for a, b in zip(new_demands, new_demands[1:])):
+        print("got difference between values larger than 500")
+        return
     
     if i > 0:
         print("decrementing electrode", electrode - 1, "by", step)
@@ -166,11 +211,21 @@ def set_influence(electrode, bimorph, bank):
 
 # X-ray utility functions
 
+@functools.lru_cache(maxsize=32)
+def _d_spacing(h, k, l, LN=0):
+    """
+    Returns twice the Si lattice plane spacing 2d [Ang] for Miller indices h,k,l
+    
+    LN: Set to 1 for 1st xtal cooled and 2nd xtal RT. Default 0
+    """
+    return 2*5.43102*(1-2.4e-4*LN)/math.sqrt(h**2+k**2+l**2)
+
+
 def xf_bragg2e(t, h=1, k=1, l=1, LN=0):
     """
     Returns Energy in eV for given Bragg angle t in deg or rad
      
-    t: Bragg angle [deg or rad]
+    t: Bragg angle [deg or rad], scalar or array
     h,k,l: Miller indices of Si crystal (optional). Default h=k=l=1
     LN: Set to 1 for 1st xtal cooled and 2nd xtal RT. Default 0
     
@@ -178,30 +233,32 @@ def xf_bragg2e(t, h=1, k=1, l=1, LN=0):
     """
     
     if LN: LN=1
-    tt = t*np.pi/180 if t > 1 else t
+    t = np.asarray(t, dtype=float)
+    tt = np.where(t > 1, np.radians(t), t)
     
-    d0 = 2*5.43102*(1-2.4e-4*LN)/np.sqrt(h**2+k**2+l**2)
+    d0 = _d_spacing(h, k, l, LN)
     E = 12398.42/(d0*np.sin(tt))
     
-    return E
+    return E[()]
 
 
 def xf_e2bragg(E, h=1, k=1, l=1):
     """
     Returns Bragg angle t in deg for given Energy in eV
     
-    E: Energy in eV. If E<100, assume it's keV and convert.
+    E: Energy in eV, scalar or array. If E<100, assume it's keV and convert.
     h,k,l: Miller indices of Si crystal optional
     
     Python version of IDL angle.pro c/o Clemens Schulze Briese
     """
     
-    if E<100: E=E*1e3
+    E = np.asarray(E, dtype=float)
+    E = np.where(E < 100, E*1e3, E)
     
-    d0 = 2*5.43102/np.sqrt(h**2+k**2+l**2)
-    t = np.arcsin(12398.42/d0/E) * 180/np.pi;
+    d0 = _d_spacing(h, k, l)
+    t = np.degrees(np.arcsin(12398.42/d0/E))
     
-    return t
+    return t[()]
 
 
 def xf_detZ2recResolution(detZ, xLambda, D=327.8):
@@ -209,14 +266,22 @@ def xf_detZ2recResolution(detZ, xLambda, D=327.8):
     Given detector to sample distance detZ, returns resolution at edge recResolution
     http://www.xray.bioc.cam.ac.uk/xray_resources/distance-calc/calc.php
     
-    detZ: crystal to detector distance [mm]
+    detZ: crystal to detector distance [mm], scalar or array
     D: diameter of detector [mm].
        Default 327.8 mm for Eiger 16M height if not specified
     xLambda: X-ray wavelength [Ang]
     recResolution: recordable resolution [Ang]
     """
     
-    recResolution = xLambda/(2*np.sin(0.5*np.arctan(0.5*D/detZ)))
+    if isinstance(detZ, numbers.Real) and isinstance(xLambda, numbers.Real):
+        # Scalar fast path, math avoids the numpy ufunc dispatch overhead.
+        # Edge cases fall through to numpy for the same inf/nan results.
+        try:
+            return xLambda/(2*math.sin(0.5*math.atan(0.5*D/detZ)))
+        except (ZeroDivisionError, ValueError):
+            pass
+    
+    recResolution = xLambda/(2*np.sin(0.5*np.arctan(0.5*D/np.asarray(detZ, dtype=float))))
     
     return recResolution
 
@@ -230,14 +295,46 @@ def xf_recResolution2detZ(recResolution, xLambda, D=327.8):
     D: diameter of detector [mm].
        Default 327.8 mm for Eiger 16M height if not specified
     xLambda: X-ray wavelength [Ang]
-    recResolution: recordable resolution [Ang]
+    recResolution: recordable resolution [Ang], scalar or array
     """
     
-    detZ = 0.5*D/np.tan(2*np.arcsin(xLambda/(2*recResolution)))
+    if isinstance(recResolution, numbers.Real) and isinstance(xLambda, numbers.Real):
+        # Scalar fast path, math avoids the numpy ufunc dispatch overhead.
+        # Edge cases fall through to numpy for the same inf/nan results.
+        try:
+            return 0.5*D/math.tan(2*math.asin(xLambda/(2*recResolution)))
+        except (ZeroDivisionError, ValueError):
+            pass
+    
+    detZ = 0.5*D/np.tan(2*np.arcsin(xLambda/(2*np.asarray(recResolution, dtype=float))))
     
     return detZ  
 
 
+def _linear_fit(x, y):
+    """
+    Least squares fit of a line y = m*x + b
+    
+    Returns (m, b), (m_err, b_err). The standard errors are scaled by the
+    reduced chi-square of the fit, and are nan for two points or less.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    
+    A = np.column_stack((x, np.ones_like(x)))
+    coef = np.linalg.lstsq(A, y, rcond=None)[0]
+    
+    dof = len(x) - 2
+    if dof > 0:
+        resid = y - A @ coef
+        cov = (resid @ resid / dof) * np.linalg.inv(A.T @ A)
+        err = np.sqrt(np.diag(cov))
+    else:
+        err = np.full(2, np.nan)
+    
+    return coef, err
+
+
 def beam_center_fit(dz, orgX, orgY):
     """
     Fit beam center to line
@@ -256,23 +353,19 @@ def beam_center_fit(dz, orgX, orgY):
     beam_center_fit(dz, orgX, orgY)
     """
     
-    def linear(x, m, b):
-        """Line: linear(x, m, b) = m*x + b"""
-        return (m*x + b)
-    
-    gmodel = Model(linear)
-    
-    print('orgX')
-    orgXresult = gmodel.fit(orgX, x=dz, m=-0.005, b=2000)
-    display(orgXresult.params)
-    plt.figure(1)
-    orgXresult.plot_fit(xlabel='dz [mm]', ylabel='orgX [px]')
-    plt.show()
-    
-    print('orgY')
-    orgYresult = gmodel.fit(orgY, x=dz, m=-0.05, b=2250)
-    display(orgYresult.params)
-    plt.figure(2)
-    orgYresult.plot_fit(xlabel='dz [mm]', ylabel='orgY [px]')
-    plt.show()
-    
\ No newline at end of file
+    dz = np.asarray(dz, dtype=float)
+    
+    for fignum, (label, org) in enumerate((('orgX', orgX), ('orgY', orgY)), start=1):
+        (m, b), (m_err, b_err) = _linear_fit(dz, org)
+        
+        print(label)
+        print('m = {:.6g} +/- {:.3g}'.format(m, m_err))
+        print('b = {:.6g} +/- {:.3g}'.format(b, b_err))
+        
+        plt.figure(fignum)
+        plt.plot(dz, org, 'o', label='data')
+        plt.plot(dz, m*dz + b, '-', label='best fit')
+        plt.xlabel('dz [mm]')
+        plt.ylabel(label + ' [px]')
+        plt.legend()
+        plt.show()